@@ -0,0 +1,10 @@
+# Suit order used by the integer card encoding (same letters as Suit in holdem.py)
+SUIT_CHARS = "HDCS"
+
+# Integer encoding: index = rank * 4 + suit, where rank 0 = two ... 12 = ace
+NUM_CARDS = 52
+
+
+def card_index(card):
+    return (card.rank.value - 2) * 4 + SUIT_CHARS.index(card.suit.value)
+
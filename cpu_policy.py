@@ -0,0 +1,245 @@
+import numpy as np
+
+from cards import NUM_CARDS
+from ranges import ENGINE, Range
+
+# Batched CPU decision engine.
+# Pending CPU decisions from many tables are gathered into arrays, the policy is
+# evaluated for the whole batch with NumPy, and the chosen actions are applied
+# back through TexasHoldem.player_action.
+
+STREETS = {"preflop": 0, "flop": 1, "turn": 2, "river": 3}
+
+# Action codes returned by evaluate_policy
+FOLD = 0
+PASSIVE = 1  # check when there is nothing to call, otherwise call
+RAISE = 2
+
+HUMAN_SEAT = 0
+MIN_RAISE = 10
+
+# Win probability against one opponent for each made-hand category:
+# high card, pair, two pair, trips, straight, flush, full house, quads
+CATEGORY_STRENGTH = np.array([0.2, 0.5, 0.68, 0.76, 0.82, 0.86, 0.93, 0.97])
+
+# Card index -> rank / suit indicator matrices, so counting is a matrix product
+RANK_MATRIX = (np.arange(NUM_CARDS)[:, None] // 4 == np.arange(13)).astype(np.float32)
+SUIT_MATRIX = (np.arange(NUM_CARDS)[:, None] % 4 == np.arange(4)).astype(np.float32)
+
+
+class DecisionBatch:
+    def __init__(self, games, hole, board, features):
+        self.games = games
+        self.hole = hole
+        self.board = board
+        (self.opponents, self.pot, self.to_call, self.current_bet,
+         self.max_bet, self.position, self.street) = features
+
+    def __len__(self):
+        return len(self.games)
+
+    @property
+    def pot_odds(self):
+        return self.to_call / np.maximum(self.pot + self.to_call, 1)
+
+    @property
+    def stack_to_pot(self):
+        return (self.max_bet - self.current_bet + self.to_call) / np.maximum(self.pot, 1)
+
+    @property
+    def can_check(self):
+        return self.to_call <= 0
+
+    @property
+    def can_call(self):
+        # The seat's stack covers the call (always true when it can check)
+        return self.max_bet >= self.current_bet
+
+    @property
+    def can_raise(self):
+        return self.max_bet > self.current_bet
+
+
+def is_cpu_turn(game, human_seat=HUMAN_SEAT):
+    return game.current_player_index != human_seat and game.game_state in STREETS
+
+
+def collect_decisions(games, human_seat=HUMAN_SEAT):
+    # Gather every table where a CPU seat is waiting to act.
+    # Pass human_seat=None when every seat is played by the CPU (simulations).
+    # Card encodings and the live-player count are kept up to date by the game,
+    # so each table costs only a handful of attribute reads. Values go into flat
+    # lists of numbers, which the garbage collector does not track.
+    pending = [game for game in games if is_cpu_turn(game, human_seat)]
+    hole = []
+    board = []
+    features = []
+
+    for game in pending:
+        index = game.current_player_index
+        player = game.players[index]
+        num_players = len(game.players)
+        street = STREETS[game.game_state]
+        first, second = player.hand
+
+        hole += (first.index, second.index)
+        board += game.board_indices
+
+        # Preflop action starts left of the big blind, afterwards at seat 0
+        first_to_act = 2 % num_players if street == 0 else 0
+        features += (
+            game.active_count - 1,
+            game.pot,
+            game.current_bet - player.current_bet,
+            game.current_bet,
+            player.current_bet + player.chips,  # highest total bet the seat can afford
+            ((index - first_to_act) % num_players) / max(num_players - 1, 1),
+            street,
+        )
+
+    return DecisionBatch(
+        pending,
+        np.array(hole, dtype=np.int16).reshape(-1, 2),
+        np.array(board, dtype=np.int16).reshape(-1, 5),
+        np.array(features, dtype=np.float64).reshape(-1, 7).T,
+    )
+
+
+def _card_counts(cards):
+    # cards: (N, k) card indices padded with -1 -> (N, 52) one-hot rows
+    counts = np.zeros((len(cards), NUM_CARDS + 1), dtype=np.float32)
+    rows = np.arange(len(cards))[:, None]
+    counts[rows, np.where(cards >= 0, cards, NUM_CARDS)] = 1
+    return counts[:, :NUM_CARDS]
+
+
+def _made_hand_category(counts):
+    # counts: (N, 52) one-hot rows -> (N,) category index.
+    # Works on (13, N) / (4, N) columns so every reduction runs across the batch.
+    rank_counts = RANK_MATRIX.T @ counts.T
+    max_count = rank_counts.max(axis=0)
+    pairs = (rank_counts >= 2).sum(axis=0)
+    trips = (rank_counts >= 3).sum(axis=0)
+
+    # Straight: five consecutive ranks present, ace also counts as low
+    present = np.concatenate([rank_counts[12:], rank_counts]) > 0
+    window = present[0:10] & present[1:11] & present[2:12] & present[3:13] & present[4:14]
+    straight = window.any(axis=0)
+    flush = (SUIT_MATRIX.T @ counts.T).max(axis=0) >= 5
+
+    return np.select(
+        [max_count >= 4, (trips >= 1) & (pairs >= 2), flush, straight,
+         max_count >= 3, pairs >= 2, pairs >= 1],
+        [7, 6, 5, 4, 3, 2, 1],
+        default=0,
+    )
+
+
+def estimate_equity(hole, board, opponents):
+    # Cheap hand-strength heuristic: win probability against one random hand,
+    # discounted for every extra opponent still in the pot
+    hole_ranks = hole // 4
+    high = hole_ranks.max(axis=1)
+    low = hole_ranks.min(axis=1)
+
+    # Preflop: pairs, high cards, suitedness and connectedness
+    suited = (hole[:, 0] % 4) == (hole[:, 1] % 4)
+    connected = (high - low) <= 1
+    preflop = np.where(
+        high == low,
+        0.5 + 0.03 * high,
+        0.32 + 0.015 * high + 0.01 * low + 0.03 * suited + 0.02 * connected,
+    )
+
+    # Postflop: made-hand category, counted only when the hole cards improve the board
+    board_counts = _card_counts(board)
+    board_category = _made_hand_category(board_counts)
+    category = _made_hand_category(board_counts + _card_counts(hole))
+    category = np.where(category > board_category, category, 0)
+    postflop = CATEGORY_STRENGTH[category] + 0.1 * high / 12
+
+    single = np.where((board >= 0).any(axis=1), postflop, preflop)
+    return np.clip(single, 0.01, 0.99) ** ((np.maximum(opponents, 1) + 1) / 2)
+
+
+def range_equity(batch):
+    # Hand-vs-range equity against the tracked range of every opponent still in the
+    # hand, combined as if the opponents were independent. Tables created without
+    # track_ranges treat every opponent as holding any two cards. Much slower per
+    # table than estimate_equity, so it suits the interactive table rather than
+    # simulations.
+    equity = np.ones(len(batch))
+    for i, game in enumerate(batch.games):
+        hole = [int(card) for card in batch.hole[i]]
+        board = [int(card) for card in batch.board[i] if card >= 0]
+        for index, player in enumerate(game.players):
+            if index == game.current_player_index or player.is_folded:
+                continue
+            opponent = game.ranges[index].narrow(ENGINE) if game.ranges is not None else Range()
+            equity[i] *= ENGINE.hand_equity(board, hole, opponent.without(hole + board))
+    return equity
+
+
+def evaluate_policy(batch, rng=None, equity=None):
+    # Returns (actions, amounts): action codes and raise-to totals for every row
+    if rng is None:
+        rng = np.random.default_rng()
+    if equity is None:
+        equity = estimate_equity(batch.hole, batch.board, batch.opponents)
+
+    margin = equity - batch.pot_odds
+    spr = batch.stack_to_pot
+    can_check = batch.can_check
+
+    scores = np.empty((len(batch), 3))
+    # Folding a free check is almost never chosen
+    scores[:, FOLD] = np.where(can_check, -3.0, -6.0 * margin)
+    scores[:, PASSIVE] = np.where(batch.can_call, 1.0 + 2.0 * margin, -np.inf)
+    # Strong hands raise more in late position, later streets and when shallow
+    scores[:, RAISE] = (
+        6.0 * (equity - 0.45)
+        + 0.5 * batch.position
+        + 0.1 * batch.street
+        - 0.2 * np.log1p(spr)
+    )
+    scores[:, RAISE] = np.where(batch.can_raise, scores[:, RAISE], -np.inf)
+
+    # Sample one action per row from the softmax of the scores
+    scores -= scores.max(axis=1, keepdims=True)
+    probs = np.exp(scores)
+    cumulative = np.cumsum(probs, axis=1)
+    draws = rng.random(len(batch)) * cumulative[:, -1]
+    actions = (cumulative < draws[:, None]).sum(axis=1)
+
+    # Raise between half and one and a half pots depending on equity
+    size = np.maximum(batch.pot * (0.5 + equity), MIN_RAISE)
+    amounts = np.minimum(batch.current_bet + np.round(size), batch.max_bet).astype(np.int64)
+    amounts = np.where(actions == RAISE, amounts, 0)
+    return actions, amounts
+
+
+def action_name(action, can_check):
+    if action == FOLD:
+        return "fold"
+    if action == RAISE:
+        return "raise"
+    return "check" if can_check else "call"
+
+
+def apply_decisions(batch, actions, amounts):
+    can_check = batch.can_check
+    for i, game in enumerate(batch.games):
+        action = action_name(actions[i], can_check[i])
+        # A rejected action leaves the seat to act again forever
+        if not game.player_action(action, int(amounts[i])):
+            raise ValueError(f"{game.players[game.current_player_index].name} cannot {action} {amounts[i]}")
+
+
+def step(games, rng=None, human_seat=HUMAN_SEAT):
+    # Decide and play one CPU action on every table waiting for a CPU seat
+    batch = collect_decisions(games, human_seat)
+    if len(batch) == 0:
+        return batch
+    actions, amounts = evaluate_policy(batch, rng)
+    apply_decisions(batch, actions, amounts)
+    return batch
@@ -0,0 +1,315 @@
+import random
+from enum import Enum
+
+from cards import card_index
+from ranges import Range
+
+# Card suits
+class Suit(Enum):
+    HEARTS = "H"
+    DIAMONDS = "D"
+    CLUBS = "C"
+    SPADES = "S"
+
+# Card ranks
+class Rank(Enum):
+    TWO = 2
+    THREE = 3
+    FOUR = 4
+    FIVE = 5
+    SIX = 6
+    SEVEN = 7
+    EIGHT = 8
+    NINE = 9
+    TEN = 10
+    JACK = 11
+    QUEEN = 12
+    KING = 13
+    ACE = 14
+
+# Card class
+class Card:
+    def __init__(self, suit, rank):
+        self.suit = suit
+        self.rank = rank
+        # Integer encoding used by the NumPy code, computed once per card
+        self.index = card_index(self)
+    
+    def __str__(self):
+        rank_str = str(self.rank.value)
+        if self.rank == Rank.JACK:
+            rank_str = "J"
+        elif self.rank == Rank.QUEEN:
+            rank_str = "Q"
+        elif self.rank == Rank.KING:
+            rank_str = "K"
+        elif self.rank == Rank.ACE:
+            rank_str = "A"
+        return f"{rank_str}{self.suit.value}"
+
+# Deck class
+class Deck:
+    def __init__(self):
+        # Cards are immutable, so the same 52 are reused for every hand
+        self.all_cards = [Card(suit, rank) for suit in Suit for rank in Rank]
+        self.cards = []
+        self.reset()
+    
+    def reset(self):
+        self.cards = list(self.all_cards)
+        self.shuffle()
+    
+    def shuffle(self):
+        random.shuffle(self.cards)
+    
+    def deal(self):
+        if len(self.cards) > 0:
+            return self.cards.pop()
+        return None
+
+# Player class
+class Player:
+    def __init__(self, name, chips=1000):
+        self.name = name
+        self.chips = chips
+        self.hand = []
+        self.is_folded = False
+        self.current_bet = 0
+    
+    def add_card(self, card):
+        self.hand.append(card)
+    
+    def clear_hand(self):
+        self.hand = []
+        self.is_folded = False
+        self.current_bet = 0
+    
+    def bet(self, amount):
+        if amount <= self.chips:
+            self.chips -= amount
+            self.current_bet += amount
+            return amount
+        return 0
+    
+    def fold(self):
+        self.is_folded = True
+
+# Game class
+class TexasHoldem:
+    def __init__(self, track_ranges=False):
+        self.deck = Deck()
+        self.community_cards = []
+        self.board_indices = [-1] * 5  # community card encodings, padded with -1
+        self.players = [Player("Player"), Player("CPU1"), Player("CPU2"), Player("CPU3")]
+        self.current_player_index = 0
+        self.pot = 0
+        self.game_state = "waiting"  # waiting, preflop, flop, turn, river, showdown
+        self.current_bet = 0
+        self.small_blind = 5
+        self.big_blind = 10
+        self.last_action = None
+        self.action_messages = []
+        self.round_complete = False
+        self.winner = None
+        self.active_count = len(self.players)  # players who have not folded
+        # Hand ranges the CPUs assign to each player, narrowed as they act.
+        # Off by default so simulations that never read them pay nothing.
+        self.track_ranges = track_ranges
+        self.ranges = None
+    
+    def start_new_hand(self):
+        self.deck.reset()
+        self.community_cards = []
+        self.board_indices = [-1] * 5
+        self.pot = 0
+        self.current_bet = 0
+        self.round_complete = False
+        self.winner = None
+        
+        # Clear all player hands
+        for player in self.players:
+            player.clear_hand()
+        self.active_count = len(self.players)
+        if self.track_ranges:
+            self.ranges = [Range() for _ in self.players]
+        
+        # Deal 2 cards to each player
+        for _ in range(2):
+            for player in self.players:
+                player.add_card(self.deck.deal())
+        
+        # Set blind bets
+        self.players[0].bet(self.small_blind)
+        self.players[1].bet(self.big_blind)
+        self.pot = self.small_blind + self.big_blind
+        self.current_bet = self.big_blind
+        
+        self.current_player_index = 2 % len(self.players)
+        self.game_state = "preflop"
+        self.last_action = None
+    
+    def deal_community_card(self):
+        card = self.deck.deal()
+        self.board_indices[len(self.community_cards)] = card.index
+        self.community_cards.append(card)
+    
+    def deal_flop(self):
+        # Burn card
+        self.deck.deal()
+        # Deal 3 flop cards
+        for _ in range(3):
+            self.deal_community_card()
+        self.game_state = "flop"
+        self.current_player_index = 0
+        self.current_bet = 0
+        self.round_complete = False
+        for player in self.players:
+            player.current_bet = 0
+        # Reset last action when moving to a new betting round
+        self.last_action = None
+    
+    def deal_turn(self):
+        # Burn card
+        self.deck.deal()
+        # Deal turn card
+        self.deal_community_card()
+        self.game_state = "turn"
+        self.current_player_index = 0
+        self.current_bet = 0
+        self.round_complete = False
+        for player in self.players:
+            player.current_bet = 0
+        # Reset last action when moving to a new betting round
+        self.last_action = None
+    
+    def deal_river(self):
+        # Burn card
+        self.deck.deal()
+        # Deal river card
+        self.deal_community_card()
+        self.game_state = "river"
+        self.current_player_index = 0
+        self.current_bet = 0
+        self.round_complete = False
+        for player in self.players:
+            player.current_bet = 0
+        # Reset last action when moving to a new betting round
+        self.last_action = None
+    
+    def next_player(self):
+        # Store the starting player index to check if we've gone around the table
+        start_index = self.current_player_index
+        
+        # Move to next player
+        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+        
+        # Skip folded players
+        while self.players[self.current_player_index].is_folded:
+            self.current_player_index = (self.current_player_index + 1) % len(self.players)
+            # If all players are folded except one, we're done
+            if all(p.is_folded for p in self.players if p != self.players[self.current_player_index]):
+                self.round_complete = True
+                return
+        
+        # Check if we've gone around the table back to the first player who acted in this round
+        # or if we've reached the player after the last raiser
+        active_players = [p for p in self.players if not p.is_folded]
+        if len(active_players) <= 1:
+            self.round_complete = True
+        elif all(p.current_bet == self.current_bet for p in active_players):
+            # If everyone has matched the current bet, mark the round as complete
+            # This is needed for the case where everyone checks
+            # Back to the first player still in the hand (seat 0 may have folded)
+            first_active = next(i for i, p in enumerate(self.players) if not p.is_folded)
+            if self.current_player_index == first_active:
+                self.round_complete = True
+    
+    def check_round_end(self):
+        # Check if all players have bet or folded
+        active_players = [p for p in self.players if not p.is_folded]
+        if len(active_players) == 1:
+            # If only one player remains, they win
+            active_players[0].chips += self.pot
+            self.game_state = "waiting"
+            return True
+        
+        # Check if all active players have made equal bets and the round is complete
+        bet_amounts = [p.current_bet for p in active_players]
+        
+        # All players have had a chance to act and all bets are equal
+        if len(set(bet_amounts)) == 1 and self.round_complete:
+            # Move to next stage
+            if self.game_state == "preflop":
+                self.deal_flop()
+            elif self.game_state == "flop":
+                self.deal_turn()
+            elif self.game_state == "turn":
+                self.deal_river()
+            elif self.game_state == "river":
+                self.game_state = "showdown"
+                # Simple win determination (actual poker hand evaluation is complex)
+                winner = random.choice(active_players)
+                winner.chips += self.pot
+                # Announced by the UI
+                self.winner = winner
+            
+            # Reset round_complete flag
+            self.round_complete = False
+            return True
+        return False
+    
+    def player_action(self, action, amount=0):
+        player = self.players[self.current_player_index]
+        
+        if action == "fold":
+            player.fold()
+            self.active_count -= 1
+            # Check if only one player remains
+            active_players = [p for p in self.players if not p.is_folded]
+            if len(active_players) == 1:
+                self.round_complete = True
+        elif action == "check":
+            if player.current_bet < self.current_bet:
+                return False  # Can't check
+            # チェックはベットがない状態で「パス」するだけなので、ラウンド完了の判定は次のプレイヤーに移動するときに行う
+        elif action == "call":
+            call_amount = self.current_bet - player.current_bet
+            if call_amount > player.chips:
+                return False  # Can't cover the call
+            if call_amount > 0:
+                bet_amount = player.bet(call_amount)
+                self.pot += bet_amount
+                
+                # レイズに対するコールの場合、全員がコールしたかチェック
+                active_players = [p for p in self.players if not p.is_folded]
+                if all(p.current_bet == self.current_bet for p in active_players):
+                    # 最後のプレイヤーがコールした場合、またはすべてのアクティブプレイヤーがコールした場合
+                    # 最後のレイズをしたプレイヤーの次のプレイヤーまで一周した場合
+                    self.round_complete = True
+        elif action == "raise":
+            if amount > self.current_bet:
+                raise_amount = amount - player.current_bet
+                bet_amount = player.bet(raise_amount)
+                self.pot += bet_amount
+                self.current_bet = player.current_bet
+                # After a raise, reset round completion status and mark this player as the last raiser
+                self.round_complete = False
+            else:
+                return False  # Invalid raise amount
+        
+        # Narrow the acting player's range (applied when the range is next used)
+        if self.ranges is not None:
+            self.ranges[self.current_player_index].observe(
+                self.board_indices[:len(self.community_cards)], action)
+        
+        # Store the last action for display purposes
+        self.last_action = {
+            "player": player.name,
+            "action": action,
+            "amount": amount if action == "raise" else self.current_bet
+        }
+        
+        # Move to next player
+        self.next_player()
+        self.check_round_end()
+        return True
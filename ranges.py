@@ -0,0 +1,323 @@
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from cards import NUM_CARDS
+
+# Hand ranges and range-vs-range equity.
+# A range is a weight for each of the 1326 two-card combos. The equity engine
+# evaluates every combo on every runout of a board once, caches the hand values,
+# and answers range-vs-range queries from cumulative sums over the sorted values,
+# correcting for combos that share cards. A single hand is compared directly.
+
+NUM_COMBOS = 1326
+
+COMBOS = np.array(list(combinations(range(NUM_CARDS), 2)), dtype=np.intp)
+COMBO_CARDS = np.zeros((NUM_COMBOS, NUM_CARDS), dtype=np.float32)
+COMBO_CARDS[np.arange(NUM_COMBOS)[:, None], COMBOS] = 1
+COMBO_INDEX = np.full((NUM_CARDS, NUM_CARDS), -1, dtype=np.intp)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(NUM_COMBOS)
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(NUM_COMBOS)
+
+# 13-bit rank masks: bit r is set when rank r (0 = two ... 12 = ace) is present
+_MASKS = np.arange(1 << 13, dtype=np.int32)
+POPCOUNT = ((_MASKS[:, None] >> np.arange(13)) & 1).sum(axis=1).astype(np.int32)
+
+
+def _top_bits(count):
+    # Keep only the highest `count` bits of every mask
+    top = _MASKS.copy()
+    for _ in range(13):
+        top = np.where(POPCOUNT[top] > count, top & (top - 1), top)
+    return top
+
+
+TOP1, TOP2, TOP3, TOP5 = (_top_bits(count) for count in (1, 2, 3, 5))
+
+# Highest straight in a mask as 1 + top rank (the wheel counts as five high), 0 if none
+STRAIGHT_HIGH = np.zeros(1 << 13, dtype=np.int32)
+for _high in range(3, 13):
+    _window = sum(1 << rank for rank in range(_high - 4, _high + 1)) if _high > 3 else 0b1000000001111
+    STRAIGHT_HIGH[(_MASKS & _window) == _window] = _high + 1
+
+# Runouts evaluated at a time, keeping the temporaries small enough to stay in cache
+EVALUATE_CHUNK = 64
+
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+
+
+def _value(category, major, kicker=0):
+    # Hand value layout: category << 26 | major ranks << 13 | kicker ranks.
+    # Rank sets of the same size compare correctly as plain integers.
+    return (category << 26) | (major << 13) | kicker
+
+
+def _suit_masks(cards):
+    # cards: (N, k) card indices -> (N, 4) rank masks per suit
+    masks = np.zeros((len(cards), 4), dtype=np.int16)
+    rows = np.arange(len(cards))
+    for column in cards.T:
+        masks[rows, column % 4] |= 1 << (column // 4)
+    return masks
+
+
+COMBO_MASKS = _suit_masks(COMBOS)
+
+
+def _evaluate(s0, s1, s2, s3):
+    # Best five-card value from four suit masks of seven distinct cards.
+    # Every major / kicker goes through an int32 table so values never overflow.
+    present = s0 | s1 | s2 | s3
+    pairs = (s0 & s1) | (s0 & s2) | (s0 & s3) | (s1 & s2) | (s1 & s3) | (s2 & s3)
+    trips = (s0 & s1 & (s2 | s3)) | (s2 & s3 & (s0 | s1))
+    quads = s0 & s1 & s2 & s3
+    num_pairs = POPCOUNT[pairs]
+
+    flush = np.zeros_like(present)
+    for suit in (s0, s1, s2, s3):
+        flush = np.where(POPCOUNT[suit] >= 5, suit, flush)
+    straight = STRAIGHT_HIGH[present]
+    straight_flush = STRAIGHT_HIGH[flush]
+
+    # Higher categories always outrank lower ones, so the best value is the
+    # maximum over every category the hand qualifies for
+    value = _value(HIGH_CARD, 0, TOP5[present])
+    top_pair = TOP1[pairs]
+    np.maximum(value, np.where(
+        pairs > 0, _value(PAIR, top_pair, TOP3[present & ~pairs]), 0), out=value)
+    top_pairs = TOP2[pairs]
+    np.maximum(value, np.where(
+        num_pairs >= 2, _value(TWO_PAIR, top_pairs, TOP1[present & ~top_pairs]), 0), out=value)
+    top_trips = TOP1[trips]
+    np.maximum(value, np.where(
+        trips > 0, _value(TRIPS, top_trips, TOP2[present & ~top_trips]), 0), out=value)
+    np.maximum(value, np.where(straight > 0, _value(STRAIGHT, straight), 0), out=value)
+    np.maximum(value, np.where(flush > 0, _value(FLUSH, TOP5[flush]), 0), out=value)
+    np.maximum(value, np.where(
+        (trips > 0) & (num_pairs >= 2), _value(FULL_HOUSE, top_trips, TOP1[pairs & ~top_trips]), 0), out=value)
+    top_quads = TOP1[quads]
+    np.maximum(value, np.where(
+        quads > 0, _value(QUADS, top_quads, TOP1[present & ~quads]), 0), out=value)
+    np.maximum(value, np.where(straight_flush > 0, _value(STRAIGHT_FLUSH, straight_flush), 0), out=value)
+    return value
+
+
+def hand_values(cards):
+    # cards: (N, 7) card indices -> (N,) comparable hand values
+    masks = _suit_masks(np.asarray(cards))
+    return _evaluate(*masks.T)
+
+
+def _flat(index):
+    # Turn per-row indices along the last axis into indices into the flattened array
+    rows = np.arange(0, index.size, index.shape[-1], dtype=np.int32)
+    return (index.astype(np.int32) + rows.reshape(index.shape[:-1] + (1,))).ravel()
+
+
+class _TieGroups:
+    # Tie-group bounds of values already sorted along the last axis
+    def __init__(self, ranked):
+        size = ranked.shape[-1]
+        index = np.broadcast_to(np.arange(size, dtype=np.int32), ranked.shape)
+        boundary = ranked[..., 1:] != ranked[..., :-1]
+        edge = np.ones(ranked.shape[:-1] + (1,), dtype=bool)
+
+        start = np.where(np.concatenate([edge, boundary], axis=-1), index, 0)
+        self.start = _flat(np.maximum.accumulate(start, axis=-1))
+        end = np.where(np.concatenate([boundary, edge], axis=-1), index, size - 1)
+        self.end = _flat(np.minimum.accumulate(end[..., ::-1], axis=-1)[..., ::-1])
+
+    def less_equal(self, ranked):
+        # For every slot: total weight of strictly lower slots, and of slots with an equal value
+        cumulative = np.cumsum(ranked, axis=-1)
+        less = (cumulative - ranked).take(self.start).reshape(ranked.shape)
+        upto = cumulative.take(self.end).reshape(ranked.shape)
+        return less, upto - less
+
+
+def action_likelihood(strength, action):
+    # How likely each combo is to take `action`, given its equity against a random hand
+    if action == "raise":
+        return 0.05 + 0.95 / (1 + np.exp(-12 * (strength - 0.6)))
+    if action == "call":
+        return 0.05 + 0.95 / (1 + np.exp(-10 * (strength - 0.45)))
+    if action == "check":
+        # Strong hands sometimes check too, so the top of the range is only thinned
+        return 1 - 0.5 / (1 + np.exp(-12 * (strength - 0.7)))
+    return np.ones_like(strength)
+
+
+# Shared by every untouched range; weights are replaced, never modified in place
+FULL_WEIGHTS = np.ones(NUM_COMBOS)
+FULL_WEIGHTS.flags.writeable = False
+
+
+class Range:
+    def __init__(self, weights=None):
+        if weights is None:
+            weights = FULL_WEIGHTS
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # (board, action) pairs seen through player_action but not yet applied;
+        # board strengths are costly, so narrowing happens when the range is used
+        self.observed = []
+
+    def observe(self, board, action):
+        self.observed.append((tuple(board), action))
+
+    def narrow(self, engine):
+        for board, action in self.observed:
+            self.weights = self.weights * action_likelihood(engine.board_strength(board), action)
+        self.observed = []
+        # Rescale so repeated narrowing never underflows
+        top = self.weights.max()
+        if top > 0:
+            self.weights = self.weights / top
+        return self
+
+    def without(self, cards):
+        # Card removal: drop every combo holding one of the known cards
+        cards = list(cards)
+        if not cards:
+            return Range(self.weights)
+        blocked = COMBO_CARDS[:, cards].any(axis=1)
+        return Range(np.where(blocked, 0, self.weights))
+
+
+class BoardRanks:
+    # Hand values of all 1326 combos on every runout of one board, plus the sort
+    # orders every equity query needs. Only the weights change between queries,
+    # so queries are reduced to gathers, cumulative sums and matrix products.
+    def __init__(self, runouts):
+        self.runouts = runouts
+        num_runouts = len(runouts)
+        masks = _suit_masks(runouts)
+        self.values = np.empty((num_runouts, NUM_COMBOS), dtype=np.int32)
+        for chunk in range(0, num_runouts, EVALUATE_CHUNK):
+            part = masks[chunk:chunk + EVALUATE_CHUNK]
+            self.values[chunk:chunk + EVALUATE_CHUNK] = _evaluate(
+                *(part[:, suit, None] | COMBO_MASKS[None, :, suit] for suit in range(4)))
+
+        runout_cards = np.zeros((num_runouts, NUM_CARDS), dtype=np.float32)
+        runout_cards[np.arange(num_runouts)[:, None], runouts] = 1
+        self.valid = (runout_cards @ COMBO_CARDS.T) == 0
+
+        # Combos in value order, and each combo's slot in that order
+        order = np.argsort(self.values, axis=1)
+        self.order = _flat(order)
+        self.position = np.empty_like(self.order)
+        self.position[self.order] = np.arange(self.order.size, dtype=np.int32)
+        self.groups = _TieGroups(self.values.take(self.order).reshape(num_runouts, -1))
+
+        # Combos holding each card, in value order: bucket the sorted combos by
+        # card with a stable sort, which keeps every bucket in value order
+        cards = COMBOS.astype(np.int8)[order].reshape(num_runouts, -1)
+        bucket = _flat(np.argsort(cards, axis=1, kind="stable"))
+        combo_slot = np.arange(bucket.size, dtype=np.int32) // 2
+        self.card_order = self.order[combo_slot[bucket]]
+        self.card_groups = _TieGroups(
+            self.values.take(self.card_order).reshape(num_runouts, NUM_CARDS, -1))
+
+        # Bucket slots of both cards of every combo, in combo order
+        slots = np.empty_like(bucket)
+        slots[bucket] = np.arange(bucket.size, dtype=np.int32)
+        slots = slots.reshape(-1, 2)[self.position]
+        self.first_slot, self.second_slot = slots.T.copy()
+        self.strength = None
+
+    def results(self, opponent):
+        # Per runout and hero combo: equity share won against the opponent range,
+        # and the opponent weight it was played against
+        shape = self.values.shape
+        weights = self.valid * opponent.weights.astype(np.float32)
+        flat_weights = weights.ravel()
+        less, equal = self.groups.less_equal(flat_weights.take(self.order).reshape(shape))
+        less = less.take(self.position).reshape(shape)
+        equal = equal.take(self.position).reshape(shape)
+
+        # Opponent combos sharing a card with the hero combo cannot be dealt;
+        # the hero combo itself sits in both of its cards' buckets
+        card_less, card_equal = self.card_groups.less_equal(
+            flat_weights.take(self.card_order).reshape(shape[0], NUM_CARDS, -1))
+        blocked_less = card_less.take(self.first_slot) + card_less.take(self.second_slot)
+        blocked_equal = card_equal.take(self.first_slot) + card_equal.take(self.second_slot)
+        card_totals = weights @ COMBO_CARDS
+        blocked_total = card_totals[:, COMBOS[:, 0]] + card_totals[:, COMBOS[:, 1]]
+
+        score = (less - blocked_less.reshape(shape)) + 0.5 * (equal - blocked_equal.reshape(shape) + weights)
+        total = (weights @ np.ones(NUM_COMBOS, dtype=np.float32))[:, None] - blocked_total + weights
+        return score * self.valid, total * self.valid
+
+    def hand_results(self, combo, opponent):
+        # Equity share won by a single hero combo summed over the runouts, and the
+        # opponent weight it was played against. Compares the hero's value with
+        # every combo directly, much cheaper than results() for all 1326 combos.
+        hero = self.values[:, combo, None]
+        live = self.valid & self.valid[:, combo, None]
+        # Opponent combos sharing a card with the hero (the hero combo included)
+        blocked = COMBO_CARDS @ COMBO_CARDS[combo] > 0
+        weights = live * np.where(blocked, 0, opponent.weights).astype(np.float32)
+        score = weights[self.values < hero].sum() + 0.5 * weights[self.values == hero].sum()
+        return score, weights.sum()
+
+
+class EquityEngine:
+    def __init__(self, max_runouts=1200, cache_size=4, seed=0):
+        # Boards with more completions than max_runouts (preflop) are sampled.
+        # A cached preflop or flop board takes about 84MB (a turn board under 4MB),
+        # and a hand only revisits its own preflop / flop / turn / river boards,
+        # so the cache is small and drops the least recently used board.
+        self.max_runouts = max_runouts
+        self.cache_size = cache_size
+        self.rng = np.random.default_rng(seed)
+        self.boards = {}
+
+    def board_ranks(self, board):
+        key = tuple(sorted(int(card) for card in board))
+        ranks = self.boards.pop(key, None)
+        if ranks is None:
+            if len(self.boards) >= self.cache_size:
+                self.boards.pop(next(iter(self.boards)))
+            ranks = BoardRanks(self._runouts(key))
+        # Most recently used boards live at the end of the dict
+        self.boards[key] = ranks
+        return ranks
+
+    def _runouts(self, board):
+        deck = np.setdiff1d(np.arange(NUM_CARDS), board)
+        missing = 5 - len(board)
+        count = comb(len(deck), missing)
+        if count <= self.max_runouts:
+            extra = np.array(list(combinations(deck, missing)), dtype=np.intp).reshape(count, missing)
+        else:
+            picks = self.rng.random((self.max_runouts, len(deck))).argsort(axis=1)[:, :missing]
+            extra = deck[picks]
+        fixed = np.broadcast_to(np.array(board, dtype=np.intp), (len(extra), len(board)))
+        return np.concatenate([fixed, extra], axis=1)
+
+    def combo_equity(self, board, opponent):
+        # Equity of every combo against the opponent range (0 for combos that cannot be dealt)
+        score, total = self.board_ranks(board).results(opponent)
+        score = score.sum(axis=0)
+        total = total.sum(axis=0)
+        return np.divide(score, total, out=np.zeros(NUM_COMBOS), where=total > 0)
+
+    def hand_equity(self, board, hole, opponent):
+        score, total = self.board_ranks(board).hand_results(COMBO_INDEX[hole[0], hole[1]], opponent)
+        return score / total if total > 0 else 0.0
+
+    def range_equity(self, board, hero, opponent):
+        score, total = self.board_ranks(board).results(opponent)
+        total = hero.weights @ total.sum(axis=0)
+        return hero.weights @ score.sum(axis=0) / total if total > 0 else 0.0
+
+    def board_strength(self, board):
+        # Equity of every combo against a random hand on this board, cached per board
+        ranks = self.board_ranks(board)
+        if ranks.strength is None:
+            ranks.strength = self.combo_equity(board, Range())
+        return ranks.strength
+
+
+# Shared by every table, so identical boards are only evaluated once
+ENGINE = EquityEngine()
@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+
+import cpu_policy
+from holdem import TexasHoldem
+
+
+def test_step_finishes_every_headless_hand():
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    games = [TexasHoldem() for _ in range(100)]
+    # Short and empty stacks from the start, so seats that cannot cover a call show up early
+    for i, game in enumerate(games):
+        game.players[i % 4].chips = (0, 3, 25)[i % 3]
+    hands = [0] * len(games)
+    steps = [0] * len(games)
+
+    for _ in range(600):
+        for i, game in enumerate(games):
+            if game.game_state in ("waiting", "showdown"):
+                game.start_new_hand()
+                hands[i] += 1
+                steps[i] = 0
+        cpu_policy.step(games, rng, human_seat=None)
+        for i in range(len(games)):
+            steps[i] += 1
+            # Four seats never need this many actions for one hand
+            assert steps[i] < 100
+
+    assert min(hands) > 10
+    assert all(player.chips >= 0 for game in games for player in game.players)
+
+
+def test_policy_only_raises_to_affordable_amounts():
+    games = [TexasHoldem() for _ in range(200)]
+    for game in games:
+        game.start_new_hand()
+    batch = cpu_policy.collect_decisions(games, human_seat=None)
+    actions, amounts = cpu_policy.evaluate_policy(batch, np.random.default_rng(1))
+
+    raises = actions == cpu_policy.RAISE
+    assert np.all(amounts[raises] > batch.current_bet[raises])
+    assert np.all(amounts[raises] <= batch.max_bet[raises])
+    assert np.all(amounts[~raises] == 0)
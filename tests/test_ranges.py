@@ -0,0 +1,238 @@
+import random
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from holdem import TexasHoldem
+from ranges import COMBO_INDEX, COMBOS, ENGINE, EquityEngine, Range, hand_values
+
+
+def brute_force_key(cards):
+    # Best five-card hand by trying every five-card subset
+    best = None
+    for five in combinations(cards, 5):
+        ranks = tuple(sorted((card // 4 for card in five), reverse=True))
+        counts = {}
+        for rank in ranks:
+            counts[rank] = counts.get(rank, 0) + 1
+        groups = sorted(counts.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        shape = [count for _, count in groups]
+        order = tuple(rank for rank, _ in groups)
+        flush = len({card % 4 for card in five}) == 1
+        straight = None
+        if len(counts) == 5 and ranks[0] - ranks[4] == 4:
+            straight = ranks[0]
+        elif ranks == (12, 3, 2, 1, 0):
+            straight = 3
+
+        if straight is not None and flush:
+            key = (8, (straight,))
+        elif shape[0] == 4:
+            key = (7, order)
+        elif shape[:2] == [3, 2]:
+            key = (6, order)
+        elif flush:
+            key = (5, ranks)
+        elif straight is not None:
+            key = (4, (straight,))
+        elif shape[0] == 3:
+            key = (3, order)
+        elif shape[:2] == [2, 2]:
+            key = (2, order)
+        elif shape[0] == 2:
+            key = (1, order)
+        else:
+            key = (0, ranks)
+        if best is None or key > best:
+            best = key
+    return best
+
+
+def dense_ranks(keys):
+    ordered = sorted(set(keys))
+    lookup = {key: rank for rank, key in enumerate(ordered)}
+    return [lookup[key] for key in keys]
+
+
+def sample_hands(rng, count):
+    # Random hands plus hands crowded into few ranks, one suit or a run of ranks,
+    # so every category shows up often
+    hands = []
+    for _ in range(count):
+        kind = rng.randrange(5)
+        if kind == 0:
+            hand = rng.sample(range(52), 7)
+        elif kind in (1, 2):
+            ranks = rng.sample(range(13), kind + 2)
+            hand = rng.sample([rank * 4 + suit for rank in ranks for suit in range(4)], 7)
+        elif kind == 3:
+            suit = rng.randrange(4)
+            hand = rng.sample([rank * 4 + suit for rank in range(13)], rng.randrange(5, 8))
+        else:
+            low = rng.randrange(-1, 9)
+            hand = [((low + step) % 13) * 4 + rng.randrange(4) for step in range(5)]
+        rest = [card for card in range(52) if card not in hand]
+        hands.append(hand + rng.sample(rest, 7 - len(hand)))
+    return hands
+
+
+def test_hand_values_match_brute_force_ordering():
+    hands = sample_hands(random.Random(0), 6000)
+    values = hand_values(np.array(hands))
+    expected = dense_ranks([brute_force_key(hand) for hand in hands])
+    assert dense_ranks(values.tolist()) == expected
+    # Every category, straight flushes included, is covered
+    assert set((values >> 26).tolist()) == set(range(9))
+
+
+def brute_force_equity(board, hero, villain):
+    # hero / villain: {combo index: weight}; every runout of every compatible pair
+    score = total = 0.0
+    for i, hero_weight in hero.items():
+        for j, villain_weight in villain.items():
+            held = set(COMBOS[i].tolist()) | set(COMBOS[j].tolist())
+            if len(held) < 4 or held & set(board):
+                continue
+            deck = [card for card in range(52) if card not in held and card not in board]
+            runouts = [board + list(extra) for extra in combinations(deck, 5 - len(board))]
+            hero_values = hand_values(np.array([runout + COMBOS[i].tolist() for runout in runouts]))
+            villain_values = hand_values(np.array([runout + COMBOS[j].tolist() for runout in runouts]))
+            wins = (hero_values > villain_values).sum() + 0.5 * (hero_values == villain_values).sum()
+            score += hero_weight * villain_weight * wins
+            total += hero_weight * villain_weight * len(runouts)
+    return score / total
+
+
+def weights_of(combos, rng):
+    return {COMBO_INDEX[a, b]: rng.uniform(0.1, 1.0) for a, b in combos}
+
+
+def as_range(weights):
+    vector = np.zeros(len(COMBOS))
+    for index, weight in weights.items():
+        vector[index] = weight
+    return Range(vector)
+
+
+@pytest.mark.parametrize("board", [[0, 17, 50, 33], [4, 21, 38, 9, 44]])
+def test_hand_vs_full_range_matches_brute_force(board):
+    rng = random.Random(1)
+    hole = [card for card in (48, 49, 8, 13) if card not in board][:2]
+    villain = {index: rng.uniform(0.1, 1.0) for index in range(len(COMBOS))}
+
+    engine = EquityEngine()
+    equity = engine.hand_equity(board, hole, as_range(villain))
+    expected = brute_force_equity(board, {COMBO_INDEX[hole[0], hole[1]]: 1.0}, villain)
+    assert equity == pytest.approx(expected, abs=1e-5)
+
+
+def test_flop_equities_match_brute_force():
+    rng = random.Random(2)
+    board = [0, 17, 50]
+    hole = [48, 49]
+    # Sparse ranges that share cards with each other, with the hero hand and with
+    # the board, so the shared-card correction is exercised
+    villain = weights_of([(48, 44), (49, 45), (44, 45), (1, 2), (17, 18), (20, 24),
+                          (30, 31), (48, 1), (2, 3), (6, 10), (51, 47), (0, 5)], rng)
+    hero = weights_of([(48, 49), (44, 40), (1, 3), (30, 34), (45, 2)], rng)
+
+    engine = EquityEngine()
+    hand_equity = engine.hand_equity(board, hole, as_range(villain))
+    assert hand_equity == pytest.approx(
+        brute_force_equity(board, {COMBO_INDEX[48, 49]: 1.0}, villain), abs=1e-5)
+
+    range_equity = engine.range_equity(board, as_range(hero), as_range(villain))
+    assert range_equity == pytest.approx(brute_force_equity(board, hero, villain), abs=1e-5)
+
+
+def test_river_range_vs_range_matches_brute_force():
+    rng = random.Random(3)
+    board = [4, 21, 38, 9, 44]
+    hero = {index: rng.uniform(0.0, 1.0) for index in rng.sample(range(len(COMBOS)), 60)}
+    villain = {index: rng.uniform(0.0, 1.0) for index in rng.sample(range(len(COMBOS)), 80)}
+
+    engine = EquityEngine()
+    equity = engine.range_equity(board, as_range(hero), as_range(villain))
+    assert equity == pytest.approx(brute_force_equity(board, hero, villain), abs=1e-5)
+
+
+def test_card_removal_drops_blocked_combos():
+    narrowed = Range().without([0, 51])
+    assert narrowed.weights[COMBO_INDEX[0, 1]] == 0
+    assert narrowed.weights[COMBO_INDEX[50, 51]] == 0
+    assert narrowed.weights[COMBO_INDEX[1, 2]] == 1
+    assert narrowed.weights.sum() == len(COMBOS) - 2 * 51 + 1
+
+
+def test_player_action_narrows_tracked_ranges():
+    random.seed(4)
+    game = TexasHoldem(track_ranges=True)
+    game.start_new_hand()
+    # Seats 2, 3 and 0 call the big blind, which closes preflop and deals the flop
+    for _ in range(3):
+        assert game.player_action("call")
+    assert game.game_state == "flop"
+    # The last call is recorded against the board it was made on, not the new flop
+    assert game.ranges[0].observed == [((), "call")]
+    assert game.ranges[1].observed == []
+
+    flop = tuple(game.board_indices[:3])
+    assert game.player_action("raise", 40)
+    assert game.ranges[0].observed == [((), "call"), (flop, "raise")]
+
+    called = Range()
+    called.observe((), "call")
+    called.narrow(ENGINE)
+    raised = game.ranges[0].narrow(ENGINE)
+    assert raised.observed == []
+
+    # Relative to calling alone, the raise moves weight towards combos that are
+    # strong on the flop, in strength order
+    strength = ENGINE.board_strength(flop)
+    live = np.flatnonzero(Range().without(flop).weights)
+    live = live[np.argsort(strength[live], kind="stable")]
+    gain = raised.weights[live] / called.weights[live]
+    assert gain[-1] > 5 * gain[0]
+    assert np.all(np.diff(gain) >= -1e-9 * gain[:-1])
+
+
+def test_untracked_game_keeps_no_ranges():
+    game = TexasHoldem()
+    game.start_new_hand()
+    game.player_action("call")
+    assert game.ranges is None
+
+
+def test_board_cache_drops_least_recently_used():
+    engine = EquityEngine(cache_size=2)
+    first, second, third = [4, 21, 38, 9, 44], [0, 17, 50, 33, 8], [1, 2, 3, 5, 6]
+    ranks = engine.board_ranks(first)
+    engine.board_ranks(second)
+    # Card order does not matter, and the hit makes `first` the most recent board
+    assert engine.board_ranks(first[::-1]) is ranks
+    engine.board_ranks(third)
+    assert list(engine.boards) == [tuple(sorted(first)), tuple(sorted(third))]
+    assert engine.board_ranks(first) is ranks
+
+
+def test_sampled_preflop_equity():
+    engine = EquityEngine()
+    runouts = engine.board_ranks([]).runouts
+    assert runouts.shape == (engine.max_runouts, 5)
+    assert all(len(set(runout)) == 5 for runout in runouts.tolist())
+    # Exact preflop equities against a random hand: AA 85.2%, KK 82.4%, 72o 34.6%
+    for hole, expected in (([48, 49], 0.852), ([44, 45], 0.824), ([0, 21], 0.346)):
+        equity = engine.hand_equity([], hole, Range().without(hole))
+        assert equity == pytest.approx(expected, abs=0.015)
+
+
+def test_hand_equity_matches_combo_equity_on_sampled_runouts():
+    # Sampled runouts can hold the hero's own cards, which both paths must skip
+    rng = random.Random(5)
+    engine = EquityEngine(max_runouts=200)
+    opponent = Range(np.array([rng.uniform(0.0, 1.0) for _ in range(len(COMBOS))]))
+    table = engine.combo_equity([], opponent)
+    for hole in ([48, 49], [0, 21], [30, 35]):
+        expected = table[COMBO_INDEX[hole[0], hole[1]]]
+        assert engine.hand_equity([], hole, opponent) == pytest.approx(expected, abs=1e-5)